@@ -1,43 +1,108 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Blueprint, Response, current_app, g, request, jsonify, send_from_directory, render_template, make_response
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy.exc import IntegrityError
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt, verify_jwt_in_request
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 import os
+import re
+import json
+import gzip
+import hashlib
+import threading
+import time
+import math
+import sqlite3
+import tempfile
+from collections import OrderedDict
 from functools import wraps
 import requests
+from requests.adapters import HTTPAdapter
+from jinja2 import TemplateNotFound
 
-app = Flask(__name__, static_folder='static', template_folder='templates')
-# Use SQLite as fallback if MySQL is not available (easier for testing)
-database_url = os.getenv('DATABASE_URL')
-if not database_url:
-    # Default to SQLite for easy setup
-    database_url = 'sqlite:///refunds.db'
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
-app.config['JWT_TOKEN_LOCATION'] = ['headers']
-app.config['JWT_HEADER_NAME'] = 'Authorization'
-app.config['JWT_HEADER_TYPE'] = 'Bearer'
-app.config['JWT_ALGORITHM'] = 'HS256'
-
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
-CORS(
-    app,
-    resources={r"/api/*": {
-        "origins": ["http://localhost:5000", "http://127.0.0.1:5000"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "supports_credentials": True
-    }}
-)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the expensive-route cap falls back to a per-process semaphore
+    fcntl = None
+
+db = SQLAlchemy()
+jwt = JWTManager()
+cors = CORS()
+bp = Blueprint('main', __name__)
+
+def load_config(app):
+    """Populate the app config from environment variables"""
+    # Use SQLite as fallback if MySQL is not available (easier for testing)
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        # Default to SQLite for easy setup
+        database_url = 'sqlite:///refunds.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
+    app.config['JWT_HEADER_NAME'] = 'Authorization'
+    app.config['JWT_HEADER_TYPE'] = 'Bearer'
+    app.config['JWT_ALGORITHM'] = 'HS256'
+    # Encode list endpoints with orjson when it is installed (set FAST_JSON=false to use the stdlib encoder)
+    app.config['FAST_JSON'] = os.getenv('FAST_JSON', 'true').lower() == 'true'
+    # Upstream product API (point PRODUCT_API_URL at a local stub server for testing)
+    app.config['PRODUCT_API_URL'] = os.getenv('PRODUCT_API_URL', 'https://fakestoreapi.com').rstrip('/')
+    app.config['PRODUCT_API_CONNECT_TIMEOUT'] = float(os.getenv('PRODUCT_API_CONNECT_TIMEOUT', '2'))
+    app.config['PRODUCT_API_READ_TIMEOUT'] = float(os.getenv('PRODUCT_API_READ_TIMEOUT', '5'))
+    app.config['PRODUCT_API_POOL_SIZE'] = int(os.getenv('PRODUCT_API_POOL_SIZE', '20'))
+    app.config['PRODUCT_API_FAILURE_THRESHOLD'] = int(os.getenv('PRODUCT_API_FAILURE_THRESHOLD', '5'))
+    app.config['PRODUCT_API_RESET_TIMEOUT'] = float(os.getenv('PRODUCT_API_RESET_TIMEOUT', '30'))
+    # Idempotency-Key replay window, in-process cache size, and how long an unfinished request holds its key
+    app.config['IDEMPOTENCY_TTL'] = int(os.getenv('IDEMPOTENCY_TTL', str(24 * 60 * 60)))
+    app.config['IDEMPOTENCY_CACHE_SIZE'] = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '1024'))
+    app.config['IDEMPOTENCY_LOCK_TIMEOUT'] = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '60'))
+    # Admission control: per-identity rate limits, kept in memory unless RATE_LIMIT_STORE names a SQLite
+    # file shared by all workers on the host, and a host-wide cap on concurrent requests to expensive
+    # routes, enforced with lock files in EXPENSIVE_ROUTE_LOCK_DIR
+    app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    app.config['RATE_LIMIT_STORE'] = os.getenv('RATE_LIMIT_STORE', '')
+    app.config['EXPENSIVE_ROUTE_CONCURRENCY'] = int(os.getenv('EXPENSIVE_ROUTE_CONCURRENCY', '4'))
+    app.config['EXPENSIVE_ROUTE_LOCK_DIR'] = os.getenv(
+        'EXPENSIVE_ROUTE_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'refunds-expensive-slots')
+    )
+    # Output of build_assets.py; pages fall back to the unbuilt files in static/ without it
+    app.config['ASSET_DIST_DIR'] = os.getenv(
+        'ASSET_DIST_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'dist')
+    )
+    # Warm the connection pool and page caches in each worker right after it forks
+    app.config['WORKER_WARM_UP'] = os.getenv('WORKER_WARM_UP', 'true').lower() == 'true'
+
+_worker_resources_lock = threading.Lock()
+
+def worker_resource(name, factory):
+    """Return a per-process object built from the current app's config on first use.
+    
+    Objects holding sockets, locks or caches must not be shared across a pre-fork, so they
+    are kept per app in app.extensions and rebuilt lazily whenever the current process
+    differs from the one that built them.
+    """
+    resources = current_app.extensions.setdefault('worker_resources', {})
+    resource = resources.get(name)
+    if resource is None or resource[0] != os.getpid():
+        with _worker_resources_lock:
+            resource = resources.get(name)
+            if resource is None or resource[0] != os.getpid():
+                resource = (os.getpid(), factory(current_app.config))
+                resources[name] = resource
+    return resource[1]
 
 # Request logging middleware
-@app.before_request
+@bp.before_app_request
 def log_request_info():
     if request.path.startswith('/api/'):
         auth_header = request.headers.get('Authorization', 'Not provided')
@@ -63,6 +128,205 @@ def missing_token_callback(error):
     print(f"Request headers: {dict(request.headers)}")
     return jsonify({'message': 'Authorization token is missing', 'error': 'authorization_required'}), 401
 
+# Admission control
+# Token bucket (tokens per second, burst) for each role and route class
+RATE_LIMITS = {
+    'anonymous': {'auth': (0.5, 10), 'read': (5, 20), 'write': (1, 5), 'expensive': (0.2, 2)},
+    'customer': {'auth': (0.5, 10), 'read': (5, 20), 'write': (1, 10), 'expensive': (0.2, 2)},
+    'admin': {'auth': (0.5, 10), 'read': (20, 60), 'write': (10, 30), 'expensive': (1, 5)},
+}
+# Endpoints whose class is not derived from the HTTP method
+ROUTE_CLASSES = {
+    'main.register': 'auth',
+    'main.login': 'auth',
+    'main.get_returns_analytics': 'expensive',
+    'main.get_customer_analytics': 'expensive',
+}
+
+class MemoryBucketStore:
+    """Token buckets held in this process"""
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.buckets = {}
+        self.lock = threading.Lock()
+    
+    def take(self, key, rate, burst):
+        """Take one token; return 0 if allowed, otherwise the seconds until a token is available"""
+        now = time.time()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens, retry_after = _take_token(tokens, updated, now, rate, burst)
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_entries:
+                self._prune(now)
+        return retry_after
+    
+    def _prune(self, now):
+        # Buckets idle this long have refilled completely, so forgetting them changes nothing
+        idle_buckets = [key for key, (_, updated) in self.buckets.items() if now - updated > 300]
+        for key in idle_buckets:
+            del self.buckets[key]
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file, shared by every worker process on the host"""
+    def __init__(self, path, busy_timeout=1):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+        self.last_prune = 0.0
+    
+    def _connection(self):
+        # Connections are opened per thread and per process, so they are never shared across a fork
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            try:
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+                connection.execute('CREATE TABLE IF NOT EXISTS rate_limit_buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+            except sqlite3.Error:
+                # Not cached, so the next call retries the setup
+                connection.close()
+                raise
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+    
+    def take(self, key, rate, burst):
+        """Take one token; raises sqlite3.Error if the store is locked or unavailable"""
+        connection = self._connection()
+        now = time.time()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute('SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens, retry_after = _take_token(tokens, updated, now, rate, burst)
+            connection.execute('INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            if now - self.last_prune > 60:
+                # Same rule as MemoryBucketStore: idle buckets are full again, so dropping them changes nothing
+                connection.execute('DELETE FROM rate_limit_buckets WHERE updated < ?', (now - 300,))
+                self.last_prune = now
+            connection.execute('COMMIT')
+        except Exception:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+        return retry_after
+
+def _take_token(tokens, updated, now, rate, burst):
+    tokens = min(burst, tokens + max(now - updated, 0) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+def get_rate_limit_store():
+    return worker_resource('rate_limit_store', lambda config: (
+        SQLiteBucketStore(config['RATE_LIMIT_STORE']) if config['RATE_LIMIT_STORE'] else MemoryBucketStore()
+    ))
+
+class HostSlots:
+    """A fixed number of slots shared by every worker process on the host.
+    
+    Each slot is an flock()ed lock file, so the kernel frees it if a worker dies mid-request.
+    """
+    def __init__(self, directory, slots):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = [os.path.join(directory, f'slot-{i}.lock') for i in range(slots)]
+    
+    def acquire(self):
+        """Take a free slot without waiting; returns a token for release(), or None if all are taken"""
+        for path in self.paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+            except OSError:
+                os.close(fd)
+                raise
+        return None
+    
+    def release(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+class ProcessSlots:
+    """HostSlots interface over a semaphore, for platforms without flock()"""
+    def __init__(self, slots):
+        self.semaphore = threading.BoundedSemaphore(slots)
+    
+    def acquire(self):
+        return True if self.semaphore.acquire(blocking=False) else None
+    
+    def release(self, token):
+        self.semaphore.release()
+
+def get_expensive_route_slots():
+    return worker_resource('expensive_route_slots', lambda config: (
+        HostSlots(config['EXPENSIVE_ROUTE_LOCK_DIR'], config['EXPENSIVE_ROUTE_CONCURRENCY']) if fcntl
+        else ProcessSlots(config['EXPENSIVE_ROUTE_CONCURRENCY'])
+    ))
+
+def get_route_class():
+    route_class = ROUTE_CLASSES.get(request.endpoint)
+    if route_class:
+        return route_class
+    return 'read' if request.method in ('GET', 'HEAD') else 'write'
+
+def get_rate_limit_identity():
+    """Return (role, identity) from a valid JWT, or the client IP for anonymous callers"""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        if identity:
+            return get_jwt().get('role', 'customer'), identity
+    except Exception:
+        # Invalid and expired tokens are rejected by the view itself; limit them by IP meanwhile
+        pass
+    return 'anonymous', request.remote_addr or 'unknown'
+
+def overload_response(message, error, status_code, retry_after):
+    response = jsonify({'message': message, 'error': error})
+    response.status_code = status_code
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+@bp.before_app_request
+def admit_request():
+    """Shed API calls over their identity's rate limit or the expensive-route concurrency cap"""
+    if not current_app.config['RATE_LIMIT_ENABLED'] or not request.path.startswith('/api/') or request.method == 'OPTIONS':
+        return None
+    
+    route_class = get_route_class()
+    role, identity = get_rate_limit_identity()
+    rate, burst = RATE_LIMITS.get(role, RATE_LIMITS['anonymous'])[route_class]
+    try:
+        retry_after = get_rate_limit_store().take(f'{role}:{identity}:{route_class}', rate, burst)
+    except Exception as e:
+        # A busy or broken limiter store must not fail the request; let it through unmetered
+        print(f"Rate limit store unavailable, admitting request: {type(e).__name__}: {e}")
+        retry_after = 0
+    if retry_after:
+        return overload_response('Too many requests, please slow down', 'rate_limited', 429, retry_after)
+    
+    if route_class == 'expensive':
+        try:
+            slot = get_expensive_route_slots().acquire()
+        except OSError as e:
+            print(f"Expensive route slots unavailable, admitting request: {type(e).__name__}: {e}")
+            return None
+        if slot is None:
+            return overload_response('Server is busy, please retry shortly', 'overloaded', 503, 1)
+        g.expensive_route_slot = slot
+    return None
+
+@bp.teardown_app_request
+def release_expensive_slot(exc):
+    slot = g.pop('expensive_route_slot', None)
+    if slot is not None:
+        get_expensive_route_slots().release(slot)
+
 # Database Models
 class Customer(db.Model):
     __tablename__ = 'customers'
@@ -72,6 +336,7 @@ class Customer(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     phone_number = db.Column(db.String(15))
     address = db.Column(db.Text)
+    address_fingerprint = db.Column(db.String(40), index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -83,6 +348,7 @@ class Order(db.Model):
     order_status = db.Column(db.String(50), nullable=False)
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     shipping_address = db.Column(db.Text, nullable=False)
+    address_fingerprint = db.Column(db.String(40), index=True)
     customer = db.relationship('Customer', backref='orders')
 
 class ReturnRequest(db.Model):
@@ -145,6 +411,51 @@ class Wallet(db.Model):
     balance = db.Column(db.Numeric(10, 2), nullable=False, default=0)
     customer = db.relationship('Customer', backref='wallet', uselist=False)
 
+class IdempotencyRecord(db.Model):
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (db.UniqueConstraint('scope', 'idempotency_key'),)
+    idempotency_id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(150), nullable=False)  # role, identity and route the key belongs to
+    idempotency_key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)  # NULL while the original request is still running
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+# Address fingerprinting
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'boulevard': 'blvd',
+    'drive': 'dr', 'lane': 'ln', 'court': 'ct', 'place': 'pl',
+    'apartment': 'apt', 'suite': 'ste', 'unit': 'apt', 'north': 'n',
+    'south': 's', 'east': 'e', 'west': 'w',
+}
+
+def normalize_address(address):
+    """Normalize a free-text address so trivially different spellings compare equal"""
+    if not address:
+        return ''
+    text = re.sub(r'[^a-z0-9]+', ' ', address.lower())
+    tokens = [ADDRESS_ABBREVIATIONS.get(token, token) for token in text.split()]
+    return ' '.join(tokens)
+
+def address_fingerprint(address):
+    """Return a stable fingerprint for an address, or None if it is empty"""
+    normalized = normalize_address(address)
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+@db.event.listens_for(Customer, 'before_insert')
+@db.event.listens_for(Customer, 'before_update')
+def set_customer_address_fingerprint(mapper, connection, customer):
+    customer.address_fingerprint = address_fingerprint(customer.address)
+
+@db.event.listens_for(Order, 'before_insert')
+@db.event.listens_for(Order, 'before_update')
+def set_order_address_fingerprint(mapper, connection, order):
+    order.address_fingerprint = address_fingerprint(order.shipping_address)
+
 # Helper Functions
 def admin_required(f):
     @wraps(f)
@@ -190,8 +501,207 @@ def calculate_fraud_score(customer_id, order_id):
     if existing_returns > 0:
         score += 25.0
     
+    # Check for other accounts shipping to the same address (return rings)
+    if order and order.address_fingerprint:
+        score += calculate_address_linkage_score(customer_id, order.address_fingerprint)
+    
     return min(score, 100.0)
 
+def calculate_address_linkage_score(customer_id, fingerprint):
+    """Score cross-account activity on a shipping address via the fingerprint index"""
+    score = 0.0
+    
+    # Accounts that shipped to the address or registered with it; UNION drops duplicates
+    ordering_accounts = db.select(Order.customer_id).where(
+        Order.address_fingerprint == fingerprint,
+        Order.customer_id != customer_id
+    )
+    registered_accounts = db.select(Customer.customer_id).where(
+        Customer.address_fingerprint == fingerprint,
+        Customer.customer_id != customer_id
+    )
+    linked_accounts = db.session.execute(
+        db.select(db.func.count()).select_from(db.union(ordering_accounts, registered_accounts).subquery())
+    ).scalar() or 0
+    if linked_accounts >= 3:
+        score += 25.0
+    elif linked_accounts >= 1:
+        score += 10.0
+    
+    since = datetime.now().date() - timedelta(days=30)
+    linked_returns = db.session.query(db.func.count(ReturnRequest.return_request_id)).join(
+        Order, ReturnRequest.order_id == Order.order_id
+    ).filter(
+        Order.address_fingerprint == fingerprint,
+        ReturnRequest.customer_id != customer_id,
+        ReturnRequest.request_date >= since
+    ).scalar() or 0
+    if linked_returns >= 3:
+        score += 25.0
+    elif linked_returns >= 1:
+        score += 10.0
+    
+    return score
+
+def _json_default(obj):
+    """Encode the column types list endpoints return as they appeared before: Decimal as float, dates as ISO strings"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def json_response(payload, status=200):
+    """Serialize a payload of plain rows straight to a JSON response, bypassing jsonify"""
+    if current_app.config['FAST_JSON'] and orjson is not None:
+        body = orjson.dumps(payload, default=_json_default)
+    else:
+        body = json.dumps(payload, default=_json_default, separators=(',', ':'))
+    return Response(body, status=status, mimetype='application/json')
+
+def query_rows(*columns, where=(), order_by=(), join=(), limit=None):
+    """Run a projection query and return plain dicts keyed by column label, skipping ORM object loading"""
+    statement = db.select(*columns)
+    for target, onclause in join:
+        statement = statement.join(target, onclause)
+    statement = statement.where(*where).order_by(*order_by)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return [row._asdict() for row in db.session.execute(statement)]
+
+class ResponseCache:
+    """Thread-safe LRU of stored responses whose entries expire after a TTL"""
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry['value']
+    
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = {'value': value, 'expires': time.monotonic() + (ttl if ttl is not None else self.ttl)}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+def get_idempotency_cache():
+    return worker_resource('idempotency_cache', lambda config: ResponseCache(config['IDEMPOTENCY_CACHE_SIZE'], config['IDEMPOTENCY_TTL']))
+
+def _replay_response(stored, request_hash):
+    if stored['request_hash'] != request_hash:
+        return jsonify({'message': 'Idempotency-Key was already used with a different request'}), 422
+    response = Response(stored['body'], status=stored['status_code'], mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+_idempotency_last_purge = 0.0
+
+def _purge_expired_idempotency_records():
+    """Delete expired keys, at most once a minute per process"""
+    global _idempotency_last_purge
+    if time.monotonic() - _idempotency_last_purge < 60:
+        return
+    _idempotency_last_purge = time.monotonic()
+    IdempotencyRecord.query.filter(IdempotencyRecord.expires_at < datetime.utcnow()).delete()
+    db.session.commit()
+
+def _claim_idempotency_key(scope, key, request_hash):
+    """Insert an in-progress record for the key.
+    
+    Returns (record_id, None) when this request owns the key, or (None, response) when the
+    caller should get a stored or conflict response instead of running the view.
+    """
+    _purge_expired_idempotency_records()
+    now = datetime.utcnow()
+    record = IdempotencyRecord(
+        scope=scope,
+        idempotency_key=key,
+        request_hash=request_hash,
+        expires_at=now + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL'])
+    )
+    db.session.add(record)
+    try:
+        db.session.commit()
+        return record.idempotency_id, None
+    except IntegrityError:
+        db.session.rollback()
+    
+    existing = IdempotencyRecord.query.filter_by(scope=scope, idempotency_key=key).first()
+    if existing is None:
+        return _claim_idempotency_key(scope, key, request_hash)
+    if existing.expires_at <= now:
+        db.session.delete(existing)
+        db.session.commit()
+        return _claim_idempotency_key(scope, key, request_hash)
+    if existing.status_code is not None:
+        stored = {'request_hash': existing.request_hash, 'status_code': existing.status_code, 'body': existing.response_body}
+        get_idempotency_cache().set(f'{scope}:{key}', stored, ttl=(existing.expires_at - now).total_seconds())
+        return None, _replay_response(stored, request_hash)
+    if existing.created_at <= now - timedelta(seconds=current_app.config['IDEMPOTENCY_LOCK_TIMEOUT']):
+        # The worker that claimed the key died before finishing; let this request take over
+        db.session.delete(existing)
+        db.session.commit()
+        return _claim_idempotency_key(scope, key, request_hash)
+    return None, (jsonify({'message': 'A request with this Idempotency-Key is still being processed'}), 409)
+
+def idempotent(f):
+    """Replay the stored response for retried POSTs carrying an Idempotency-Key header.
+    
+    Must be applied below @jwt_required so keys are scoped to the caller's identity.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'message': 'Idempotency-Key must be at most 255 characters'}), 400
+        
+        scope = f"{get_jwt().get('role')}:{get_jwt_identity()}:{request.endpoint}"
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        stored = get_idempotency_cache().get(f'{scope}:{key}')
+        if stored is not None:
+            return _replay_response(stored, request_hash)
+        
+        record_id, response = _claim_idempotency_key(scope, key, request_hash)
+        if response is not None:
+            return response
+        
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyRecord.query.filter_by(idempotency_id=record_id).delete()
+            db.session.commit()
+            raise
+        
+        if response.status_code >= 500:
+            # Server errors are not stored so the client's retry runs the request again
+            IdempotencyRecord.query.filter_by(idempotency_id=record_id).delete()
+            db.session.commit()
+            return response
+        
+        body = response.get_data(as_text=True)
+        IdempotencyRecord.query.filter_by(idempotency_id=record_id).update({
+            'status_code': response.status_code,
+            'response_body': body
+        })
+        db.session.commit()
+        get_idempotency_cache().set(f'{scope}:{key}', {'request_hash': request_hash, 'status_code': response.status_code, 'body': body})
+        return response
+    return decorated
+
 def create_notification(user_id, user_type, message, notification_type):
     """Create a notification"""
     notification = Notification(
@@ -205,7 +715,7 @@ def create_notification(user_id, user_type, message, notification_type):
     db.session.commit()
 
 # API Routes - Authentication
-@app.route('/api/auth/register', methods=['POST'])
+@bp.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
     
@@ -235,7 +745,7 @@ def register():
         }
     }), 201
 
-@app.route('/api/auth/login', methods=['POST'])
+@bp.route('/api/auth/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
@@ -277,22 +787,132 @@ def login():
     except Exception as e:
         return jsonify({'message': f'Login error: {str(e)}'}), 500
 
+# Upstream product API client
+class UpstreamError(Exception):
+    """Raised when the product API cannot be used and the caller should fall back"""
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream errors, then allow a single trial call"""
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self.lock = threading.Lock()
+    
+    def allow_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_progress or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            # Half-open: let one request through to probe the upstream
+            self.trial_in_progress = True
+            return True
+    
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_progress = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class ProductAPIClient:
+    """Pooled keep-alive client for the product API with circuit breaking and request coalescing"""
+    def __init__(self, base_url, connect_timeout, read_timeout, pool_size, breaker):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+    
+    def get(self, path):
+        """GET a JSON document; concurrent calls for the same path share one upstream request.
+        
+        Returns None if the upstream reports the resource does not exist.
+        """
+        with self.lock:
+            call = self.in_flight.get(path)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self.in_flight[path] = call
+        
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = self._fetch(path)
+            except Exception as e:
+                # Waiting callers must see the same failure, never an empty result
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.in_flight[path]
+                call.done.set()
+        
+        if call.error is not None:
+            raise call.error
+        return call.result
+    
+    def _fetch(self, path):
+        if not self.breaker.allow_request():
+            raise UpstreamError('circuit open')
+        try:
+            response = self.session.get(f'{self.base_url}{path}', timeout=self.timeout)
+            if response.status_code == 404:
+                self.breaker.record_success()
+                return None
+            if response.status_code != 200:
+                raise UpstreamError(f'unexpected status {response.status_code}')
+            # fakestoreapi answers unknown product ids with an empty 200
+            result = response.json() if response.content.strip() else None
+        except Exception as e:
+            # Any failure counts, so a half-open trial always ends and the breaker can close again
+            self.breaker.record_failure()
+            if isinstance(e, UpstreamError):
+                raise
+            raise UpstreamError(f'{type(e).__name__}: {e}') from e
+        self.breaker.record_success()
+        return result
+
+def get_product_api():
+    return worker_resource('product_api', lambda config: ProductAPIClient(
+        config['PRODUCT_API_URL'],
+        config['PRODUCT_API_CONNECT_TIMEOUT'],
+        config['PRODUCT_API_READ_TIMEOUT'],
+        config['PRODUCT_API_POOL_SIZE'],
+        CircuitBreaker(config['PRODUCT_API_FAILURE_THRESHOLD'], config['PRODUCT_API_RESET_TIMEOUT'])
+    ))
+
 # API Routes - Products (E-commerce Store)
-@app.route('/api/products', methods=['GET'])
+@bp.route('/api/products', methods=['GET'])
 def get_products():
-    """Fetch products from external API (using JSONPlaceholder or similar)"""
+    """Fetch products from the external product API, falling back to sample products"""
     try:
-        # Using JSONPlaceholder as a demo API - replace with actual e-commerce API
-        response = requests.get('https://fakestoreapi.com/products', timeout=5)
-        if response.status_code == 200:
-            products = response.json()
+        products = get_product_api().get('/products')
+        if products is not None:
             return jsonify(products), 200
-        else:
-            # Fallback to sample products
-            return jsonify(get_sample_products()), 200
-    except:
-        # Fallback to sample products if API fails
-        return jsonify(get_sample_products()), 200
+    except UpstreamError as e:
+        print(f"Product API unavailable, using sample products: {e}")
+    return jsonify(get_sample_products()), 200
 
 def get_sample_products():
     """Sample products for testing"""
@@ -302,20 +922,21 @@ def get_sample_products():
         {'id': 3, 'title': 'Sample Product 3', 'price': 19.99, 'description': 'Yet another product', 'image': 'https://via.placeholder.com/300'},
     ]
 
-@app.route('/api/products/<int:product_id>', methods=['GET'])
+@bp.route('/api/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     try:
-        response = requests.get(f'https://fakestoreapi.com/products/{product_id}', timeout=5)
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({'message': 'Product not found'}), 404
-    except:
+        product = get_product_api().get(f'/products/{product_id}')
+    except UpstreamError as e:
+        print(f"Product API unavailable, using sample products: {e}")
+        product = next((p for p in get_sample_products() if p['id'] == product_id), None)
+    if product is None:
         return jsonify({'message': 'Product not found'}), 404
+    return jsonify(product), 200
 
 # API Routes - Orders
-@app.route('/api/orders', methods=['POST'])
+@bp.route('/api/orders', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_order():
     try:
         data = request.get_json()
@@ -356,7 +977,7 @@ def create_order():
         db.session.rollback()
         return jsonify({'message': f'Error creating order: {str(e)}'}), 500
 
-@app.route('/api/orders', methods=['GET'])
+@bp.route('/api/orders', methods=['GET'])
 @jwt_required()
 def get_orders():
     try:
@@ -370,19 +991,16 @@ def get_orders():
         
         # Convert string ID to integer for database query
         customer_id = int(customer_id_str)
-        orders = Order.query.filter_by(customer_id=customer_id).order_by(Order.order_date.desc()).all()
-        
-        if len(orders) == 0:
-            # Return empty array instead of error
-            return jsonify([]), 200
-        
-        return jsonify([{
-            'order_id': o.order_id,
-            'order_date': str(o.order_date),
-            'order_status': o.order_status,
-            'total_amount': float(o.total_amount),
-            'shipping_address': o.shipping_address
-        } for o in orders]), 200
+        orders = query_rows(
+            Order.order_id,
+            Order.order_date,
+            Order.order_status,
+            Order.total_amount,
+            Order.shipping_address,
+            where=[Order.customer_id == customer_id],
+            order_by=[Order.order_date.desc()]
+        )
+        return json_response(orders)
     except Exception as e:
         import traceback
         print(f"Error in get_orders: {str(e)}")
@@ -390,8 +1008,9 @@ def get_orders():
         return jsonify({'message': f'Error fetching orders: {str(e)}'}), 500
 
 # API Routes - Return Requests
-@app.route('/api/return-requests', methods=['POST'])
+@bp.route('/api/return-requests', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_return_request():
     data = request.get_json()
     customer_id_str = get_jwt_identity()
@@ -447,42 +1066,44 @@ def create_return_request():
         'fraud_score': return_request.fraud_score
     }), 201
 
-@app.route('/api/return-requests', methods=['GET'])
+@bp.route('/api/return-requests', methods=['GET'])
 @jwt_required()
 def get_return_requests():
     try:
         claims = get_jwt()
         role = claims.get('role')
         
-        if role == 'admin':
-            return_requests = ReturnRequest.query.order_by(ReturnRequest.request_date.desc()).all()
-        else:
+        where = []
+        if role != 'admin':
             customer_id_str = get_jwt_identity()
             customer_id = int(customer_id_str) if customer_id_str else None
             if not customer_id:
                 return jsonify({'message': 'Invalid token'}), 401
-            return_requests = ReturnRequest.query.filter_by(customer_id=customer_id).order_by(ReturnRequest.request_date.desc()).all()
-        
-        if len(return_requests) == 0:
-            # Return empty array instead of error
-            return jsonify([]), 200
+            where.append(ReturnRequest.customer_id == customer_id)
         
-        return jsonify([{
-            'return_request_id': r.return_request_id,
-            'order_id': r.order_id,
-            'customer_id': r.customer_id,
-            'customer_name': f"{r.customer.first_name} {r.customer.last_name}",
-            'return_reason': r.return_reason,
-            'request_date': str(r.request_date),
-            'status': r.status,
-            'approval_date': str(r.approval_date) if r.approval_date else None,
-            'fraud_score': float(r.fraud_score) if r.fraud_score else 0.0,
-            'order_total': float(r.order.total_amount)
-        } for r in return_requests]), 200
+        return_requests = query_rows(
+            ReturnRequest.return_request_id,
+            ReturnRequest.order_id,
+            ReturnRequest.customer_id,
+            (Customer.first_name + ' ' + Customer.last_name).label('customer_name'),
+            ReturnRequest.return_reason,
+            ReturnRequest.request_date,
+            ReturnRequest.status,
+            ReturnRequest.approval_date,
+            db.func.coalesce(ReturnRequest.fraud_score, 0.0).label('fraud_score'),
+            Order.total_amount.label('order_total'),
+            join=[
+                (Customer, ReturnRequest.customer_id == Customer.customer_id),
+                (Order, ReturnRequest.order_id == Order.order_id)
+            ],
+            where=where,
+            order_by=[ReturnRequest.request_date.desc()]
+        )
+        return json_response(return_requests)
     except Exception as e:
         return jsonify({'message': f'Error fetching return requests: {str(e)}'}), 500
 
-@app.route('/api/return-requests/<int:request_id>/approve', methods=['POST'])
+@bp.route('/api/return-requests/<int:request_id>/approve', methods=['POST'])
 @admin_required
 def approve_return_request(request_id):
     data = request.get_json()
@@ -544,7 +1165,7 @@ def approve_return_request(request_id):
         'refund_id': refund.refund_id
     }), 200
 
-@app.route('/api/return-requests/<int:request_id>/reject', methods=['POST'])
+@bp.route('/api/return-requests/<int:request_id>/reject', methods=['POST'])
 @admin_required
 def reject_return_request(request_id):
     data = request.get_json()
@@ -569,33 +1190,35 @@ def reject_return_request(request_id):
     return jsonify({'message': 'Return request rejected'}), 200
 
 # API Routes - Refunds
-@app.route('/api/refunds', methods=['GET'])
+@bp.route('/api/refunds', methods=['GET'])
 @jwt_required()
 def get_refunds():
     claims = get_jwt()
     role = claims.get('role')
     
-    if role == 'admin':
-        refunds = Refund.query.all()
-    else:
+    join = []
+    where = []
+    if role != 'admin':
         customer_id_str = get_jwt_identity()
         customer_id = int(customer_id_str) if customer_id_str else None
         if not customer_id:
             return jsonify({'message': 'Invalid token'}), 401
-        return_requests = ReturnRequest.query.filter_by(customer_id=customer_id).all()
-        refund_ids = [r.return_request_id for r in return_requests]
-        refunds = Refund.query.filter(Refund.return_request_id.in_(refund_ids)).all()
-    
-    return jsonify([{
-        'refund_id': r.refund_id,
-        'return_request_id': r.return_request_id,
-        'refund_amount': float(r.refund_amount),
-        'refund_date': str(r.refund_date),
-        'payment_status': r.payment_status,
-        'payment_method': r.payment_method
-    } for r in refunds]), 200
-
-@app.route('/api/wallet', methods=['GET'])
+        join.append((ReturnRequest, Refund.return_request_id == ReturnRequest.return_request_id))
+        where.append(ReturnRequest.customer_id == customer_id)
+    
+    refunds = query_rows(
+        Refund.refund_id,
+        Refund.return_request_id,
+        Refund.refund_amount,
+        Refund.refund_date,
+        Refund.payment_status,
+        Refund.payment_method,
+        join=join,
+        where=where
+    )
+    return json_response(refunds)
+
+@bp.route('/api/wallet', methods=['GET'])
 @jwt_required()
 def get_wallet():
     """Get the current customer's wallet balance."""
@@ -616,8 +1239,9 @@ def get_wallet():
         'balance': balance
     }), 200
 
-@app.route('/api/wallet/topup', methods=['POST'])
+@bp.route('/api/wallet/topup', methods=['POST'])
 @jwt_required()
+@idempotent
 def topup_wallet():
     """Add dummy funds to the customer's wallet (simulated global payment)."""
     claims = get_jwt()
@@ -654,7 +1278,7 @@ def topup_wallet():
     }), 200
 
 # API Routes - Notifications
-@app.route('/api/notifications', methods=['GET'])
+@bp.route('/api/notifications', methods=['GET'])
 @jwt_required()
 def get_notifications():
     try:
@@ -666,26 +1290,21 @@ def get_notifications():
         claims = get_jwt()
         user_type = 'admin' if claims.get('role') == 'admin' else 'customer'
         
-        notifications = Notification.query.filter_by(
-            user_id=user_id,
-            user_type=user_type
-        ).order_by(Notification.sent_date.desc()).limit(50).all()
-        
-        if len(notifications) == 0:
-            # Return empty array instead of error
-            return jsonify([]), 200
-        
-        return jsonify([{
-            'notification_id': n.notification_id,
-            'message': n.message,
-            'notification_type': n.notification_type,
-            'sent_date': str(n.sent_date),
-            'is_read': n.is_read
-        } for n in notifications]), 200
+        notifications = query_rows(
+            Notification.notification_id,
+            Notification.message,
+            Notification.notification_type,
+            Notification.sent_date,
+            Notification.is_read,
+            where=[Notification.user_id == user_id, Notification.user_type == user_type],
+            order_by=[Notification.sent_date.desc()],
+            limit=50
+        )
+        return json_response(notifications)
     except Exception as e:
         return jsonify({'message': f'Error fetching notifications: {str(e)}'}), 500
 
-@app.route('/api/notifications/<int:notification_id>/read', methods=['PUT'])
+@bp.route('/api/notifications/<int:notification_id>/read', methods=['PUT'])
 @jwt_required()
 def mark_notification_read(notification_id):
     notification = Notification.query.get(notification_id)
@@ -696,7 +1315,7 @@ def mark_notification_read(notification_id):
     return jsonify({'message': 'Notification not found'}), 404
 
 # API Routes - Analytics
-@app.route('/api/analytics/returns', methods=['GET'])
+@bp.route('/api/analytics/returns', methods=['GET'])
 @admin_required
 def get_returns_analytics():
     total_returns = ReturnRequest.query.count()
@@ -717,7 +1336,7 @@ def get_returns_analytics():
         'high_fraud_returns': high_fraud_returns
     }), 200
 
-@app.route('/api/analytics/customers', methods=['GET'])
+@bp.route('/api/analytics/customers', methods=['GET'])
 @admin_required
 def get_customer_analytics():
     total_customers = Customer.query.count()
@@ -730,6 +1349,7 @@ def get_customer_analytics():
 
 # Initialize database
 def init_db():
+    """Create missing tables and the default admin; returns True if the admin was created"""
     db.create_all()
     
     # Create default admin if not exists
@@ -743,26 +1363,158 @@ def init_db():
         )
         db.session.add(admin)
         db.session.commit()
+        return True
+    return False
+
+# Static pages and assets
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+# Precompressed variants written by build_assets.py, in order of preference
+ASSET_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+FINGERPRINTED_ASSET = re.compile(r'^(js|css)/[\w.-]+\.[0-9a-f]{12}\.(js|css)$')
+
+def read_asset_manifest(config):
+    try:
+        with open(os.path.join(config['ASSET_DIST_DIR'], 'manifest.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
-@app.route('/')
+def load_asset_manifest():
+    """Load the build_assets.py manifest once per worker; without a build, assets are served unbuilt"""
+    if current_app.debug:
+        return read_asset_manifest(current_app.config)
+    return worker_resource('asset_manifest', read_asset_manifest)
+
+@bp.app_template_global()
+def asset_url(path):
+    """URL of the fingerprinted build of a static asset, falling back to the source file"""
+    hashed_path = load_asset_manifest().get(path)
+    if hashed_path:
+        return f'/assets/{hashed_path}'
+    return f'/static/{path}'
+
+@bp.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Serve a fingerprinted asset, precompressed if the client accepts it, cached forever.
+    
+    Files from earlier builds are served too, so pages rendered before a deploy keep working.
+    """
+    dist_dir = current_app.config['ASSET_DIST_DIR']
+    if not FINGERPRINTED_ASSET.match(filename) or not os.path.isfile(os.path.join(dist_dir, filename)):
+        return "Asset not found", 404
+    
+    served_filename = filename
+    content_encoding = None
+    for encoding, suffix in ASSET_ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.exists(os.path.join(dist_dir, filename + suffix)):
+            served_filename = filename + suffix
+            content_encoding = encoding
+            break
+    
+    mimetype = 'text/css' if filename.endswith('.css') else 'application/javascript'
+    response = send_from_directory(dist_dir, served_filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def render_static_template(filename):
+    """Render a context-free page template, caching the HTML, its gzip variant and ETag"""
+    rendered_templates = worker_resource('rendered_templates', lambda config: {})
+    cached = rendered_templates.get(filename)
+    if cached is None or current_app.debug:
+        body = render_template(filename).encode('utf-8')
+        cached = {
+            'body': body,
+            'gzip_body': gzip.compress(body, mtime=0),
+            'etag': hashlib.sha1(body).hexdigest()
+        }
+        rendered_templates[filename] = cached
+    
+    if request.accept_encodings['gzip']:
+        response = make_response(cached['gzip_body'])
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(cached['etag'] + '-gzip')
+    else:
+        response = make_response(cached['body'])
+        response.set_etag(cached['etag'])
+    response.mimetype = 'text/html'
+    # Pages must be revalidated so new asset fingerprints are picked up; a match costs a bodyless 304
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request)
+
+@bp.route('/')
 def index():
-    from flask import render_template
-    return render_template('index.html')
+    return render_static_template('index.html')
 
-@app.route('/<path:filename>')
+@bp.route('/<path:filename>')
 def serve_html(filename):
-    from flask import render_template
     if filename.endswith('.html'):
         try:
-            return render_template(filename)
-        except:
+            return render_static_template(filename)
+        except TemplateNotFound:
             return f"Page {filename} not found", 404
     # Static files are handled by Flask automatically via static_folder
-    return app.send_static_file(filename)
+    return current_app.send_static_file(filename)
 
-if __name__ == '__main__':
-    with app.app_context():
-        init_db()
+# Application factory
+def create_app(config=None):
+    """Build a configured app. Nothing here connects to the database or the product API."""
+    app = Flask(__name__, static_folder='static', template_folder='templates')
+    load_config(app)
+    if config:
+        app.config.update(config)
     
-    app.run(debug=True, port=5000)
+    db.init_app(app)
+    jwt.init_app(app)
+    cors.init_app(
+        app,
+        resources={r"/api/*": {
+            "origins": ["http://localhost:5000", "http://127.0.0.1:5000"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization", "Idempotency-Key"],
+            "supports_credentials": True
+        }}
+    )
+    app.register_blueprint(bp)
+    return app
+
+def setup_worker(app):
+    """Per-worker setup, run by the pre-fork server in each worker right after it forks"""
+    with app.app_context():
+        # Forget pooled connections inherited from the master so each worker opens its own
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if app.config['WORKER_WARM_UP']:
+        try:
+            warm_up(app)
+        except Exception as e:
+            # Warm-up is only an optimisation; a failing worker would make gunicorn stop the server
+            print(f"Worker {os.getpid()} warm-up failed, continuing cold: {type(e).__name__}: {e}")
+
+def warm_up(app):
+    """Open a pooled DB connection and fill the per-process caches before the first request"""
+    with app.app_context():
+        try:
+            db.session.execute(db.text('SELECT 1'))
+        except Exception as e:
+            # The pool connects on the first request instead, once the database is reachable
+            print(f"Worker {os.getpid()} could not warm the database pool: {type(e).__name__}: {e}")
+        finally:
+            db.session.remove()
+        get_product_api()
+        get_rate_limit_store()
+        get_idempotency_cache()
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        load_asset_manifest()
+        for filename in os.listdir(os.path.join(app.root_path, app.template_folder)):
+            if filename.endswith('.html'):
+                render_static_template(filename)
+
+if __name__ == '__main__':
+    # Development server only: create the schema once with `python init_db.py` and serve
+    # production traffic with gunicorn (see gunicorn.conf.py)
+    create_app().run(debug=True, port=5000)
 
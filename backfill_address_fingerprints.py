@@ -0,0 +1,68 @@
+"""
+Address fingerprint backfill script.
+Run this script once after upgrading to add the address fingerprint columns
+and indexes to an existing database and fill them in for existing rows.
+"""
+
+from app import create_app, db, Customer, Order, address_fingerprint
+
+BATCH_SIZE = 500
+
+def ensure_fingerprint_column(table_name):
+    """Add the address_fingerprint column and index if the table predates them"""
+    inspector = db.inspect(db.engine)
+    columns = [column['name'] for column in inspector.get_columns(table_name)]
+    if 'address_fingerprint' not in columns:
+        with db.engine.begin() as connection:
+            connection.execute(db.text(f'ALTER TABLE {table_name} ADD COLUMN address_fingerprint VARCHAR(40)'))
+        print(f"✓ Added address_fingerprint column to {table_name}")
+
+    indexes = [index['name'] for index in inspector.get_indexes(table_name)]
+    index_name = f'ix_{table_name}_address_fingerprint'
+    if index_name not in indexes:
+        with db.engine.begin() as connection:
+            connection.execute(db.text(f'CREATE INDEX {index_name} ON {table_name} (address_fingerprint)'))
+        print(f"✓ Created index {index_name}")
+
+def backfill_table(model, pk_column, address_column):
+    """Fill in missing fingerprints in primary key order, one batch at a time"""
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(pk_column, address_column).filter(
+            pk_column > last_id,
+            model.address_fingerprint.is_(None),
+            address_column.isnot(None)
+        ).order_by(pk_column).limit(BATCH_SIZE).all()
+        if not rows:
+            break
+
+        db.session.bulk_update_mappings(model, [
+            {pk_column.key: row_id, 'address_fingerprint': address_fingerprint(address)}
+            for row_id, address in rows
+        ])
+        db.session.commit()
+        updated += len(rows)
+        last_id = rows[-1][0]
+    return updated
+
+def backfill_address_fingerprints():
+    """Add fingerprint columns if needed and backfill customers and orders"""
+    app = create_app()
+    with app.app_context():
+        ensure_fingerprint_column(Customer.__tablename__)
+        ensure_fingerprint_column(Order.__tablename__)
+
+        customers = backfill_table(Customer, Customer.customer_id, Customer.address)
+        print(f"✓ Backfilled {customers} customer address fingerprints")
+        orders = backfill_table(Order, Order.order_id, Order.shipping_address)
+        print(f"✓ Backfilled {orders} order address fingerprints")
+
+        print("\nAddress fingerprint backfill complete!")
+
+if __name__ == '__main__':
+    try:
+        backfill_address_fingerprints()
+    except Exception as e:
+        print(f"Error backfilling address fingerprints: {e}")
+        print("\nPlease ensure the database is reachable and DATABASE_URL is set correctly")
@@ -0,0 +1,115 @@
+"""
+List endpoint serialization benchmark.
+Compares the previous ORM + jsonify implementation of GET /api/return-requests
+and GET /api/refunds with the projection query + json_response path, on a
+throwaway SQLite database seeded with ROWS return requests and refunds.
+
+Usage: python bench_serialization.py [ROWS] [REPEAT]
+"""
+
+import io
+import os
+import sys
+import json
+import contextlib
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token, jwt_required
+from app import create_app, db, init_db, orjson, Customer, Order, ReturnRequest, Refund
+
+def legacy_return_requests():
+    """GET /api/return-requests for an admin, as implemented before projection queries"""
+    return_requests = ReturnRequest.query.order_by(ReturnRequest.request_date.desc()).all()
+    return jsonify([{
+        'return_request_id': r.return_request_id,
+        'order_id': r.order_id,
+        'customer_id': r.customer_id,
+        'customer_name': f"{r.customer.first_name} {r.customer.last_name}",
+        'return_reason': r.return_reason,
+        'request_date': str(r.request_date),
+        'status': r.status,
+        'approval_date': str(r.approval_date) if r.approval_date else None,
+        'fraud_score': float(r.fraud_score) if r.fraud_score else 0.0,
+        'order_total': float(r.order.total_amount)
+    } for r in return_requests]), 200
+
+def legacy_refunds():
+    """GET /api/refunds for an admin, as implemented before projection queries"""
+    refunds = Refund.query.all()
+    return jsonify([{
+        'refund_id': r.refund_id,
+        'return_request_id': r.return_request_id,
+        'refund_amount': float(r.refund_amount),
+        'refund_date': str(r.refund_date),
+        'payment_status': r.payment_status,
+        'payment_method': r.payment_method
+    } for r in refunds]), 200
+
+app = create_app()
+app.add_url_rule('/bench/legacy/return-requests', 'legacy_return_requests', jwt_required()(legacy_return_requests))
+app.add_url_rule('/bench/legacy/refunds', 'legacy_refunds', jwt_required()(legacy_refunds))
+
+def seed(rows):
+    """Create ROWS customers, orders, return requests and refunds"""
+    today = datetime.now().date()
+    customers = [Customer(first_name='Bench', last_name=f'Customer {i}', email=f'bench{i}@example.com',
+                          password_hash='x') for i in range(rows)]
+    db.session.add_all(customers)
+    db.session.flush()
+    orders = [Order(customer_id=c.customer_id, order_date=today - timedelta(days=i % 90), order_status='Completed',
+                    total_amount=19.99 + i % 100, shipping_address=f'{i} Bench Street') for i, c in enumerate(customers)]
+    db.session.add_all(orders)
+    db.session.flush()
+    return_requests = [ReturnRequest(order_id=o.order_id, customer_id=o.customer_id, return_reason='Damaged item',
+                                     request_date=o.order_date, status='Approved', approval_date=today,
+                                     fraud_score=float(i % 60)) for i, o in enumerate(orders)]
+    db.session.add_all(return_requests)
+    db.session.flush()
+    db.session.add_all([Refund(return_request_id=r.return_request_id, refund_amount=r.order.total_amount,
+                               refund_date=today, payment_status='Completed', payment_method='Credit Card')
+                        for r in return_requests])
+    db.session.commit()
+
+def measure(client, path, headers, repeat):
+    """Return the best wall time over REPEAT requests and the decoded response"""
+    best = float('inf')
+    # Keep the per-request logging in app.py out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(path, headers=headers)
+            best = min(best, time.perf_counter() - start)
+    assert response.status_code == 200, response.data
+    return best, json.loads(response.data)
+
+def run_benchmark(rows, repeat):
+    with app.app_context():
+        init_db()
+        seed(rows)
+        token = create_access_token(identity='1', additional_claims={'role': 'admin'})
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    encoder = 'orjson' if app.config['FAST_JSON'] and orjson is not None else 'json'
+    print(f"{rows} rows, best of {repeat}, encoder={encoder}\n")
+    print(f"{'endpoint':<24}{'legacy ms':>12}{'projection ms':>16}{'speedup':>10}")
+    for name, legacy_path, new_path in [
+        ('/api/return-requests', '/bench/legacy/return-requests', '/api/return-requests'),
+        ('/api/refunds', '/bench/legacy/refunds', '/api/refunds'),
+    ]:
+        legacy_time, legacy_body = measure(client, legacy_path, headers, repeat)
+        new_time, new_body = measure(client, new_path, headers, repeat)
+        assert legacy_body == new_body, f'{name}: responses differ'
+        print(f"{name:<24}{legacy_time * 1000:>12.1f}{new_time * 1000:>16.1f}{legacy_time / new_time:>9.1f}x")
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run_benchmark(rows, repeat)
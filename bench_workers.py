@@ -0,0 +1,117 @@
+"""
+Cold start and worker scaling benchmark.
+Measures how long the app takes to import and build, how long gunicorn takes
+to serve its first request, and requests/sec for an increasing number of
+pre-forked workers, against a throwaway SQLite database.
+
+Usage: python bench_workers.py [MAX_WORKERS] [SECONDS] [PATH]
+"""
+
+import os
+import sys
+import time
+import socket
+import tempfile
+import subprocess
+import http.client
+import multiprocessing
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench.db')
+ENV = dict(os.environ, DATABASE_URL=f'sqlite:///{DB_FILE}', RATE_LIMIT_ENABLED='false')
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def prepare_database():
+    """Bootstrap the schema and return a token for a customer with a few orders"""
+    os.environ.update(ENV)
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db, init_db, Customer, Order
+
+    app = create_app()
+    with app.app_context():
+        init_db()
+        customer = Customer(first_name='Bench', last_name='Customer', email='bench@example.com', password_hash='x')
+        db.session.add(customer)
+        db.session.flush()
+        db.session.add_all([Order(customer_id=customer.customer_id, order_date=datetime.now().date(), order_status='Completed',
+                                  total_amount=19.99, shipping_address='1 Bench Street') for _ in range(20)])
+        db.session.commit()
+        return create_access_token(identity=str(customer.customer_id), additional_claims={'role': 'customer'})
+
+def measure_import():
+    """Best of three fresh-interpreter timings for importing app.py and calling create_app()"""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'from app import create_app; create_app()'], cwd=BASE_DIR, env=ENV, check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def start_server(workers, port):
+    """Start gunicorn and return (process, seconds until the first request succeeded)"""
+    env = dict(ENV, WEB_CONCURRENCY=str(workers), BIND=f'127.0.0.1:{port}')
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=BASE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while time.perf_counter() - start < 30:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/login.html')
+            if connection.getresponse().status == 200:
+                return process, time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError(f'gunicorn with {workers} workers did not start')
+
+def client_loop(args):
+    """Issue keep-alive requests until the deadline; return the number that succeeded"""
+    port, path, token, deadline = args
+    headers = {'Authorization': f'Bearer {token}'}
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    completed = 0
+    while time.time() < deadline:
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        if response.status == 200:
+            completed += 1
+    return completed
+
+def measure_throughput(port, path, token, seconds, clients):
+    deadline = time.time() + seconds
+    with multiprocessing.Pool(clients) as pool:
+        return sum(pool.map(client_loop, [(port, path, token, deadline)] * clients)) / seconds
+
+def run_benchmark(max_workers, seconds, path):
+    token = prepare_database()
+    print(f"import + create_app(): {measure_import() * 1000:.0f} ms\n")
+
+    worker_counts = sorted({1, max_workers} | {n for n in (2, 4, 8, 16, 32) if n < max_workers})
+    clients = max(4, max_workers * 2)
+    print(f"GET {path}, {seconds}s per run, {clients} client processes, {multiprocessing.cpu_count()} cores\n")
+    print(f"{'workers':>8}{'first request ms':>18}{'req/s':>10}{'scaling':>10}")
+    baseline = None
+    for workers in worker_counts:
+        port = free_port()
+        process, cold_start = start_server(workers, port)
+        try:
+            # Let every worker finish forking and warming up before timing throughput
+            time.sleep(1)
+            throughput = measure_throughput(port, path, token, seconds, clients)
+        finally:
+            process.terminate()
+            process.wait()
+        baseline = baseline or throughput
+        print(f"{workers:>8}{cold_start * 1000:>18.0f}{throughput:>10.0f}{throughput / baseline:>9.2f}x")
+
+if __name__ == '__main__':
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else multiprocessing.cpu_count()
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    path = sys.argv[3] if len(sys.argv) > 3 else '/api/orders'
+    run_benchmark(max_workers, seconds, path)
@@ -0,0 +1,135 @@
+"""
+Static asset build script.
+Run this script before deploying to minify, fingerprint and precompress the
+JavaScript and CSS files in static/. Output is written to static/dist/ along
+with a manifest.json that app.py uses to point templates at the built files.
+
+Usage: python build_assets.py [--prune DAYS]
+"""
+
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+ASSET_DIRS = {'js': '.js', 'css': '.css'}
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{12}\.(js|css)(\.gz|\.br)?$')
+
+def minify_js(source):
+    """Strip indentation, blank lines and full-line comments.
+
+    Line breaks are kept so automatic semicolon insertion behaves exactly as before.
+    """
+    lines = []
+    for line in source.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+def minify_css(source):
+    """Remove comments and collapse whitespace around block delimiters"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,])\s*', r'\1', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+def write_asset(relative_path, content):
+    """Write the fingerprinted file plus gzip (and brotli, if available) variants"""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    root, ext = os.path.splitext(relative_path)
+    hashed_path = f'{root}.{digest}{ext}'
+    output_path = os.path.join(DIST_DIR, hashed_path)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    with open(output_path, 'wb') as f:
+        f.write(content)
+    with open(output_path + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(output_path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+    return hashed_path
+
+def read_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def build_assets():
+    """Build static/dist/ and its manifest from the source assets.
+    
+    Earlier builds are left in place: workers that have not restarted yet, and pages
+    they already rendered, keep referencing them. Remove them later with prune_assets().
+    """
+    os.makedirs(DIST_DIR, exist_ok=True)
+    previous = read_manifest()
+
+    manifest = {}
+    for directory, ext in ASSET_DIRS.items():
+        source_dir = os.path.join(STATIC_DIR, directory)
+        for filename in sorted(os.listdir(source_dir)):
+            if not filename.endswith(ext):
+                continue
+            relative_path = f'{directory}/{filename}'
+            with open(os.path.join(source_dir, filename), encoding='utf-8') as f:
+                source = f.read()
+            minified = MINIFIERS[ext](source).encode('utf-8')
+            manifest[relative_path] = write_asset(relative_path, minified)
+            print(f"✓ {relative_path} -> dist/{manifest[relative_path]} "
+                  f"({len(source.encode('utf-8'))} -> {len(minified)} bytes)")
+
+    # Date superseded files from now, so prune_assets() ages them from the last build that used them
+    for hashed_path in set(previous.values()) - set(manifest.values()):
+        for suffix in ('', '.gz', '.br'):
+            path = os.path.join(DIST_DIR, hashed_path + suffix)
+            if os.path.exists(path):
+                os.utime(path)
+
+    # Swap the manifest in atomically so a worker starting mid-build never reads half of it
+    with open(MANIFEST_PATH + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(MANIFEST_PATH + '.tmp', MANIFEST_PATH)
+
+    if brotli is None:
+        print("\nNote: 'brotli' is not installed, only gzip variants were written")
+    print(f"\nAsset build complete! Manifest written to {os.path.relpath(MANIFEST_PATH, BASE_DIR)}")
+
+def prune_assets(max_age_days):
+    """Delete fingerprinted files from earlier builds that were superseded more than MAX_AGE_DAYS ago"""
+    current = set(read_manifest().values())
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    removed = 0
+    for root, _, filenames in os.walk(DIST_DIR):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            relative_path = os.path.relpath(path, DIST_DIR).replace(os.sep, '/')
+            if not FINGERPRINTED.search(relative_path) or re.sub(r'\.(gz|br)$', '', relative_path) in current:
+                continue
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    print(f"✓ Pruned {removed} files superseded more than {max_age_days:g} days ago")
+    return removed
+
+if __name__ == '__main__':
+    build_assets()
+    if len(sys.argv) > 2 and sys.argv[1] == '--prune':
+        prune_assets(float(sys.argv[2]))
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for production serving.
+Start the server with:
+
+    gunicorn -c gunicorn.conf.py
+
+The schema is not created here; run `python init_db.py` once beforehand.
+"""
+
+import os
+import multiprocessing
+
+wsgi_app = 'app:create_app()'
+bind = os.getenv('BIND', '0.0.0.0:5000')
+# One pre-forked worker per core unless WEB_CONCURRENCY says otherwise
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+# Import the app once in the master so workers fork from an already loaded interpreter
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+
+def post_fork(server, worker):
+    from app import setup_worker
+    setup_worker(server.app.wsgi())
@@ -1,30 +1,20 @@
 """
 Database initialization script.
-Run this script to set up the database tables and create default admin account.
+Run this script once to set up the database tables and create default admin account.
+The application itself no longer does this on start-up.
 """
 
-from app import app, db, Admin, Customer, Order, ReturnRequest, Refund, Notification, PaymentTransaction
-from werkzeug.security import generate_password_hash
+from app import create_app, init_db
 
 def init_database():
     """Initialize database with tables and default admin"""
+    app = create_app()
     with app.app_context():
         print("Creating database tables...")
-        db.create_all()
+        admin_created = init_db()
         print("✓ Database tables created successfully!")
         
-        # Create default admin if not exists
-        admin = Admin.query.filter_by(email='admin@example.com').first()
-        if not admin:
-            admin = Admin(
-                first_name='Admin',
-                last_name='User',
-                email='admin@example.com',
-                role='Manager',
-                password_hash=generate_password_hash('admin123')
-            )
-            db.session.add(admin)
-            db.session.commit()
+        if admin_created:
             print("✓ Default admin account created!")
             print("  Email: admin@example.com")
             print("  Password: admin123")
@@ -32,7 +22,8 @@ def init_database():
             print("✓ Admin account already exists")
         
         print("\nDatabase initialization complete!")
-        print("You can now run the application with: python app.py")
+        print("You can now run the application with: gunicorn -c gunicorn.conf.py")
+        print("(or the development server with: python app.py)")
 
 if __name__ == '__main__':
     try:
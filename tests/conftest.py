@@ -0,0 +1,32 @@
+"""
+Shared fixtures: an app on a throwaway SQLite database with the schema created,
+and Authorization headers for a customer or admin identity.
+"""
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'refunds.db'}",
+        'TESTING': True,
+        # Tests send bursts of writes from one identity
+        'RATE_LIMIT_ENABLED': False,
+        # Nothing listens here, so product lookups fall back to the sample catalog quickly
+        'PRODUCT_API_URL': 'http://127.0.0.1:9',
+        'PRODUCT_API_CONNECT_TIMEOUT': 0.1,
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+@pytest.fixture
+def auth_headers(app):
+    def make_headers(identity, role='customer'):
+        with app.app_context():
+            token = create_access_token(identity=str(identity), additional_claims={'role': role})
+        return {'Authorization': f'Bearer {token}'}
+    return make_headers
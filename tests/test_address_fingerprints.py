@@ -0,0 +1,116 @@
+"""
+Address fingerprint tests.
+Checks that spelling variants of an address share a fingerprint, that the ORM
+keeps fingerprints current, that the linkage score only counts other accounts,
+and that the backfill script upgrades a table created before fingerprints.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+from app import (create_app, db, address_fingerprint, calculate_address_linkage_score,
+                 Customer, Order, ReturnRequest)
+from backfill_address_fingerprints import backfill_address_fingerprints
+
+ADDRESS = '12 Main Street, Apt 4'
+
+def _customer(email, address=None):
+    customer = Customer(first_name='Test', last_name='Customer', email=email, password_hash='x', address=address)
+    db.session.add(customer)
+    db.session.commit()
+    return customer
+
+def _order(customer, shipping_address=ADDRESS):
+    order = Order(customer_id=customer.customer_id, order_date=datetime.now().date() - timedelta(days=10),
+                  order_status='Completed', total_amount=25.00, shipping_address=shipping_address)
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+def _return(order, days_ago=1):
+    db.session.add(ReturnRequest(order_id=order.order_id, customer_id=order.customer_id, return_reason='Damaged item',
+                                 request_date=datetime.now().date() - timedelta(days=days_ago)))
+    db.session.commit()
+
+def test_spelling_variants_share_a_fingerprint():
+    assert address_fingerprint('12 Main Street, Apt 4') == address_fingerprint('12 main st apt 4')
+    assert address_fingerprint('12 MAIN ST.  Apartment 4') == address_fingerprint('12 main st apt 4')
+    assert address_fingerprint('12 Main Street, Apt 4') != address_fingerprint('14 Main Street, Apt 4')
+    assert address_fingerprint(' , ') is None
+    assert address_fingerprint(None) is None
+
+def test_fingerprints_are_set_on_insert_and_update(app):
+    with app.app_context():
+        customer = _customer('listener@example.com', ADDRESS)
+        order = _order(customer)
+        assert customer.address_fingerprint == address_fingerprint(ADDRESS)
+        assert order.address_fingerprint == address_fingerprint(ADDRESS)
+
+        customer.address = '7 Oak Avenue'
+        order.shipping_address = '7 Oak Ave'
+        db.session.commit()
+        # Committed attributes are expired, so these are reloaded from the database
+        assert customer.address_fingerprint == address_fingerprint('7 oak ave')
+        assert order.address_fingerprint == address_fingerprint('7 oak ave')
+
+def test_linkage_score_counts_other_accounts_and_their_returns(app):
+    with app.app_context():
+        fingerprint = address_fingerprint(ADDRESS)
+        target = _customer('target@example.com', ADDRESS)
+        for _ in range(3):
+            _return(_order(target))
+        # The customer's own orders and returns at the address are not a signal
+        assert calculate_address_linkage_score(target.customer_id, fingerprint) == 0
+
+        # Registering with the address and shipping to it count as one linked account
+        neighbour = _customer('neighbour@example.com', '12 main st apt 4')
+        assert calculate_address_linkage_score(target.customer_id, fingerprint) == 10
+        neighbour_order = _order(neighbour)
+        assert calculate_address_linkage_score(target.customer_id, fingerprint) == 10
+
+        others = [_customer(f'other{i}@example.com', '99 Elsewhere Road') for i in range(2)]
+        other_orders = [_order(other, '12 MAIN ST, APARTMENT 4') for other in others]
+        assert calculate_address_linkage_score(target.customer_id, fingerprint) == 25
+
+        _return(neighbour_order)
+        assert calculate_address_linkage_score(target.customer_id, fingerprint) == 35
+        # Returns older than 30 days are not counted
+        _return(other_orders[0], days_ago=45)
+        assert calculate_address_linkage_score(target.customer_id, fingerprint) == 35
+        _return(other_orders[0])
+        _return(other_orders[1])
+        assert calculate_address_linkage_score(target.customer_id, fingerprint) == 50
+
+def test_backfill_upgrades_a_table_created_before_fingerprints(tmp_path, monkeypatch):
+    path = tmp_path / 'legacy.db'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    connection = sqlite3.connect(path)
+    for table in ('customers', 'orders'):
+        connection.execute(f'DROP INDEX ix_{table}_address_fingerprint')
+        connection.execute(f'ALTER TABLE {table} DROP COLUMN address_fingerprint')
+    connection.execute("INSERT INTO customers (customer_id, first_name, last_name, email, password_hash, address) "
+                       "VALUES (1, 'Legacy', 'Customer', 'legacy@example.com', 'x', '12 Main Street, Apt 4'), "
+                       "(2, 'No', 'Address', 'none@example.com', 'x', NULL)")
+    connection.execute("INSERT INTO orders (order_id, customer_id, order_date, order_status, total_amount, shipping_address) "
+                       "VALUES (1, 1, '2024-01-02', 'Completed', 25.00, '12 main st apt 4')")
+    connection.commit()
+
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{path}')
+    backfill_address_fingerprints()
+
+    for table in ('customers', 'orders'):
+        columns = [row[1] for row in connection.execute(f'PRAGMA table_info({table})')]
+        assert 'address_fingerprint' in columns
+        indexes = [row[1] for row in connection.execute(f'PRAGMA index_list({table})')]
+        assert f'ix_{table}_address_fingerprint' in indexes
+    customers = dict(connection.execute('SELECT customer_id, address_fingerprint FROM customers'))
+    assert customers == {1: address_fingerprint(ADDRESS), 2: None}
+    assert connection.execute('SELECT address_fingerprint FROM orders').fetchone()[0] == address_fingerprint(ADDRESS)
+
+    # Running it again finds nothing left to do
+    backfill_address_fingerprints()
+    connection.close()
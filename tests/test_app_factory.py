@@ -0,0 +1,48 @@
+"""
+Application factory tests.
+Checks that per-process resources follow the config of the app that uses them,
+and that worker setup survives an unreachable database.
+"""
+
+import io
+import json
+import contextlib
+
+from app import create_app, setup_worker, asset_url, get_product_api, get_rate_limit_store, MemoryBucketStore, SQLiteBucketStore
+
+def test_worker_resources_are_built_per_app(tmp_path):
+    dist_dir = tmp_path / 'dist'
+    dist_dir.mkdir()
+    (dist_dir / 'manifest.json').write_text(json.dumps({'js/auth.js': 'js/auth.0123456789ab.js'}))
+    first = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'PRODUCT_API_URL': 'http://127.0.0.1:9',
+        'ASSET_DIST_DIR': str(tmp_path / 'no-build'),
+    })
+    second = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'PRODUCT_API_URL': 'http://127.0.0.1:8765',
+        'RATE_LIMIT_STORE': str(tmp_path / 'rate-limits.db'),
+        'ASSET_DIST_DIR': str(dist_dir),
+    })
+
+    with first.app_context():
+        assert get_product_api().base_url == 'http://127.0.0.1:9'
+        assert isinstance(get_rate_limit_store(), MemoryBucketStore)
+        assert asset_url('js/auth.js') == '/static/js/auth.js'
+    with second.app_context():
+        assert get_product_api().base_url == 'http://127.0.0.1:8765'
+        assert isinstance(get_rate_limit_store(), SQLiteBucketStore)
+        assert asset_url('js/auth.js') == '/assets/js/auth.0123456789ab.js'
+    with first.app_context():
+        # Built once per app and process, then reused
+        assert get_product_api() is get_product_api()
+
+def test_worker_boots_when_database_is_unreachable(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'missing-dir' / 'refunds.db'}", 'WORKER_WARM_UP': True})
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        setup_worker(app)
+    assert 'could not warm the database pool' in output.getvalue()
+    # The rest of the warm-up still ran
+    _, rendered_templates = app.extensions['worker_resources']['rendered_templates']
+    assert 'login.html' in rendered_templates
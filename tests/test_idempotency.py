@@ -0,0 +1,133 @@
+"""
+Idempotency-Key tests.
+Checks that retried writes run once and replay the stored response, also from
+a freshly started app, and that conflicting, unfinished and failed requests
+are handled without losing or repeating a write.
+"""
+
+import json
+import hashlib
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from app import create_app, db, Customer, Order, Wallet, IdempotencyRecord
+
+@pytest.fixture
+def customer_id(app):
+    with app.app_context():
+        customer = Customer(first_name='Retry', last_name='Customer', email='retry@example.com', password_hash='x')
+        db.session.add(customer)
+        db.session.commit()
+        return customer.customer_id
+
+@pytest.fixture
+def headers(auth_headers, customer_id):
+    return auth_headers(customer_id)
+
+def _post(client, path, headers, key, payload):
+    return client.post(path, data=json.dumps(payload), content_type='application/json',
+                       headers={**headers, 'Idempotency-Key': key})
+
+def _topup(client, headers, key, amount=10):
+    return _post(client, '/api/wallet/topup', headers, key, {'amount': amount})
+
+def _balance(app, customer_id):
+    with app.app_context():
+        wallet = Wallet.query.filter_by(customer_id=customer_id).first()
+        return float(wallet.balance) if wallet else 0.0
+
+def _record_count(app):
+    with app.app_context():
+        return IdempotencyRecord.query.count()
+
+def test_retried_topup_credits_the_wallet_once(app, headers, customer_id):
+    client = app.test_client()
+    first = _topup(client, headers, 'topup-1')
+    retry = _topup(client, headers, 'topup-1')
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json() == first.get_json()
+    assert 'Idempotent-Replayed' not in first.headers
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert _balance(app, customer_id) == 10
+
+    assert _topup(client, headers, 'topup-2').status_code == 200
+    assert _balance(app, customer_id) == 20
+
+def test_retry_on_a_fresh_app_replays_from_the_database(app, headers, customer_id):
+    first = _topup(app.test_client(), headers, 'topup-1')
+
+    restarted = create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'RATE_LIMIT_ENABLED': False})
+    retry = _topup(restarted.test_client(), headers, 'topup-1')
+    assert retry.status_code == 200
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert _balance(app, customer_id) == 10
+
+def test_reusing_a_key_with_a_different_body_is_rejected(app, headers, customer_id):
+    client = app.test_client()
+    assert _topup(client, headers, 'topup-1', amount=10).status_code == 200
+    assert _topup(client, headers, 'topup-1', amount=500).status_code == 422
+    assert _balance(app, customer_id) == 10
+
+def test_unfinished_request_blocks_retries_until_the_lock_times_out(app, headers, customer_id):
+    body = json.dumps({'amount': 10})
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.add(IdempotencyRecord(
+            scope=f'customer:{customer_id}:main.topup_wallet',
+            idempotency_key='topup-1',
+            request_hash=hashlib.sha256(body.encode()).hexdigest(),
+            created_at=now,
+            expires_at=now + timedelta(days=1)
+        ))
+        db.session.commit()
+
+    client = app.test_client()
+    assert _topup(client, headers, 'topup-1').status_code == 409
+    assert _balance(app, customer_id) == 0
+
+    # The worker that claimed the key died; once the lock times out a retry takes the key over
+    with app.app_context():
+        stale = datetime.utcnow() - timedelta(seconds=app.config['IDEMPOTENCY_LOCK_TIMEOUT'] + 1)
+        IdempotencyRecord.query.update({'created_at': stale})
+        db.session.commit()
+    response = _topup(client, headers, 'topup-1')
+    assert response.status_code == 200
+    assert 'Idempotent-Replayed' not in response.headers
+    assert _balance(app, customer_id) == 10
+
+def test_server_error_is_not_stored(app, headers, monkeypatch):
+    def failing_order(**kwargs):
+        raise RuntimeError('database is down')
+
+    client = app.test_client()
+    payload = {'total_amount': 25.00, 'shipping_address': '12 Main Street'}
+    monkeypatch.setattr(app_module, 'Order', failing_order)
+    assert _post(client, '/api/orders', headers, 'order-1', payload).status_code == 500
+    assert _record_count(app) == 0
+
+    monkeypatch.undo()
+    retry = _post(client, '/api/orders', headers, 'order-1', payload)
+    assert retry.status_code == 201
+    assert 'Idempotent-Replayed' not in retry.headers
+    with app.app_context():
+        assert Order.query.count() == 1
+
+def test_exception_in_the_view_releases_the_key(app, headers, customer_id, monkeypatch):
+    def failing_wallet(customer_id):
+        raise RuntimeError('wallet service unavailable')
+
+    client = app.test_client()
+    monkeypatch.setattr(app_module, 'get_or_create_wallet', failing_wallet)
+    with pytest.raises(RuntimeError):
+        _topup(client, headers, 'topup-1')
+    assert _record_count(app) == 0
+
+    monkeypatch.undo()
+    retry = _topup(client, headers, 'topup-1')
+    assert retry.status_code == 200
+    assert 'Idempotent-Replayed' not in retry.headers
+    assert _balance(app, customer_id) == 10
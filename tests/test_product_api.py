@@ -0,0 +1,136 @@
+"""
+Product API client tests.
+Runs the client against a local stub server to check that concurrent lookups
+share one upstream request, that an open circuit falls back to the sample
+catalog without waiting on the upstream, and that the circuit closes again.
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import create_app, get_product_api
+
+class StubProductAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.hits = {}
+        self.delay = 0.0
+        self.status = 200
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def total_hits(self):
+        return sum(self.hits.values())
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        stub = self.server
+        with stub.lock:
+            stub.hits[self.path] = stub.hits.get(self.path, 0) + 1
+        time.sleep(stub.delay)
+
+        if stub.status != 200:
+            body = b'upstream error'
+        elif self.path == '/products':
+            body = json.dumps([{'id': 1, 'title': 'Upstream Product 1'}]).encode()
+        elif self.path == '/products/999':
+            # Like fakestoreapi, unknown ids get an empty 200
+            body = b''
+        else:
+            product_id = int(self.path.rsplit('/', 1)[1])
+            body = json.dumps({'id': product_id, 'title': f'Upstream Product {product_id}'}).encode()
+        self.send_response(stub.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub():
+    server = StubProductAPI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def app(stub):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'RATE_LIMIT_ENABLED': False,
+        'PRODUCT_API_URL': stub.url,
+        'PRODUCT_API_READ_TIMEOUT': 5,
+        'PRODUCT_API_FAILURE_THRESHOLD': 2,
+        'PRODUCT_API_RESET_TIMEOUT': 0.5,
+    })
+
+def test_concurrent_lookups_share_one_upstream_request(app, stub):
+    stub.delay = 0.3
+    barrier = threading.Barrier(10)
+    responses = []
+
+    def lookup():
+        client = app.test_client()
+        barrier.wait()
+        responses.append(client.get('/api/products/7'))
+
+    threads = [threading.Thread(target=lookup) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stub.hits == {'/products/7': 1}
+    assert [r.status_code for r in responses] == [200] * 10
+    assert all(r.get_json()['title'] == 'Upstream Product 7' for r in responses)
+
+def test_open_circuit_falls_back_fast_and_recovers(app, stub):
+    client = app.test_client()
+    stub.status = 500
+    stub.delay = 0.3
+    for _ in range(2):
+        response = client.get('/api/products')
+        assert response.get_json()[0]['title'] == 'Sample Product 1'
+    assert stub.total_hits() == 2
+
+    # The breaker is open: the sample catalog is served without waiting on the upstream
+    start = time.perf_counter()
+    response = client.get('/api/products')
+    assert time.perf_counter() - start < 0.2
+    assert response.get_json()[0]['title'] == 'Sample Product 1'
+    assert stub.total_hits() == 2
+
+    stub.status = 200
+    stub.delay = 0.0
+    time.sleep(0.6)
+    response = client.get('/api/products')
+    assert response.get_json()[0]['title'] == 'Upstream Product 1'
+    assert stub.total_hits() == 3
+    with app.app_context():
+        assert get_product_api().breaker.opened_at is None
+    client.get('/api/products')
+    assert stub.total_hits() == 4
+
+def test_product_lookup_falls_back_to_sample_catalog(app, stub):
+    client = app.test_client()
+    assert client.get('/api/products/5').get_json()['title'] == 'Upstream Product 5'
+    assert client.get('/api/products/999').status_code == 404
+
+    stub.status = 503
+    response = client.get('/api/products/2')
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'Sample Product 2'
+    assert client.get('/api/products/42').status_code == 404
@@ -0,0 +1,100 @@
+"""
+Rate limiting tests.
+Covers the shared SQLite bucket store, failing open when it is unavailable, and
+the host-wide cap on concurrent expensive requests.
+"""
+
+import io
+import os
+import errno
+import sqlite3
+import contextlib
+import multiprocessing
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+import app as app_module
+from app import create_app, HostSlots, SQLiteBucketStore
+
+def test_sqlite_store_limits_and_prunes_idle_buckets(tmp_path):
+    path = str(tmp_path / 'rate-limits.db')
+    store = SQLiteBucketStore(path)
+    assert store.take('admin:1:read', 1, 2) == 0
+    assert store.take('admin:1:read', 1, 2) == 0
+    assert store.take('admin:1:read', 1, 2) > 0
+
+    connection = sqlite3.connect(path)
+    connection.execute("INSERT INTO rate_limit_buckets (key, tokens, updated) VALUES ('anonymous:10.0.0.1:read', 20, 0)")
+    connection.commit()
+    store.last_prune = 0.0
+    store.take('admin:2:read', 1, 2)
+    keys = [row[0] for row in connection.execute('SELECT key FROM rate_limit_buckets')]
+    assert 'anonymous:10.0.0.1:read' not in keys
+    assert 'admin:1:read' in keys
+
+def test_unavailable_store_admits_requests(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'RATE_LIMIT_STORE': str(tmp_path / 'missing-dir' / 'rate-limits.db'),
+        'PRODUCT_API_URL': 'http://127.0.0.1:9',
+        'PRODUCT_API_CONNECT_TIMEOUT': 0.1,
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = app.test_client().get('/api/products')
+    assert response.status_code == 200
+
+def _hold_slot(directory, held, done):
+    slots = HostSlots(directory, 1)
+    slot = slots.acquire()
+    held.set()
+    done.wait(10)
+    slots.release(slot)
+
+def test_expensive_route_cap_is_shared_across_processes(tmp_path):
+    directory = str(tmp_path / 'slots')
+    held, done = multiprocessing.Event(), multiprocessing.Event()
+    holder = multiprocessing.Process(target=_hold_slot, args=(directory, held, done))
+    holder.start()
+    try:
+        assert held.wait(10)
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'EXPENSIVE_ROUTE_CONCURRENCY': 1,
+            'EXPENSIVE_ROUTE_LOCK_DIR': directory,
+        })
+        with app.app_context():
+            token = create_access_token(identity='1', additional_claims={'role': 'admin'})
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = app.test_client().get('/api/analytics/returns', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        done.set()
+        holder.join()
+
+    slots = HostSlots(directory, 1)
+    slot = slots.acquire()
+    assert slot is not None
+    slots.release(slot)
+
+def test_slot_lock_errors_do_not_leak_descriptors(tmp_path, monkeypatch):
+    slots = HostSlots(str(tmp_path / 'slots'), 1)
+    opened = []
+    real_open = os.open
+
+    def tracking_open(*args, **kwargs):
+        fd = real_open(*args, **kwargs)
+        opened.append(fd)
+        return fd
+
+    def failing_flock(fd, operation):
+        raise OSError(errno.ENOLCK, 'No locks available')
+
+    monkeypatch.setattr(app_module.os, 'open', tracking_open)
+    monkeypatch.setattr(app_module.fcntl, 'flock', failing_flock)
+    with pytest.raises(OSError):
+        slots.acquire()
+    assert len(opened) == 1
+    with pytest.raises(OSError):
+        os.fstat(opened[0])
@@ -0,0 +1,94 @@
+"""
+List endpoint serialization tests.
+Checks that the list endpoints return the same JSON with the orjson encoder as
+with the standard library one, in the format the endpoints used before
+projection queries.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, Customer, Order, ReturnRequest, Refund, Notification
+
+pytest.importorskip('orjson')
+
+@pytest.fixture
+def customer_id(app):
+    today = datetime.now().date()
+    with app.app_context():
+        customer = Customer(first_name='Zoë', last_name='Brontë', email='zoe@example.com', password_hash='x')
+        db.session.add(customer)
+        db.session.flush()
+        orders = [
+            Order(customer_id=customer.customer_id, order_date=today - timedelta(days=3), order_status='Completed',
+                  total_amount='19.99', shipping_address='1 Rue de l’Église'),
+            Order(customer_id=customer.customer_id, order_date=today - timedelta(days=1), order_status='Completed',
+                  total_amount='120.50', shipping_address='2 Main Street'),
+        ]
+        db.session.add_all(orders)
+        db.session.flush()
+        approved = ReturnRequest(order_id=orders[0].order_id, customer_id=customer.customer_id,
+                                 return_reason='Damaged item', request_date=today - timedelta(days=2),
+                                 status='Approved', approval_date=today, fraud_score=12.5)
+        pending = ReturnRequest(order_id=orders[1].order_id, customer_id=customer.customer_id,
+                                return_reason='Wrong size', request_date=today, fraud_score=None)
+        db.session.add_all([approved, pending])
+        db.session.flush()
+        db.session.add(Refund(return_request_id=approved.return_request_id, refund_amount='19.99', refund_date=today,
+                              payment_status='Completed', payment_method='Wallet'))
+        db.session.add_all([
+            Notification(user_id=customer.customer_id, user_type='customer', message='Refund of €19.99 approved',
+                         notification_type='refund_approved', sent_date=today),
+            Notification(user_id=customer.customer_id, user_type='customer', message='Return received',
+                         notification_type='return_submitted', sent_date=today - timedelta(days=2), is_read=True),
+        ])
+        db.session.commit()
+        return customer.customer_id
+
+@pytest.mark.parametrize('role, path', [
+    ('customer', '/api/return-requests'),
+    ('admin', '/api/return-requests'),
+    ('customer', '/api/refunds'),
+    ('admin', '/api/refunds'),
+    ('customer', '/api/orders'),
+    ('customer', '/api/notifications'),
+])
+def test_fast_json_matches_stdlib_encoder(app, auth_headers, customer_id, role, path):
+    client = app.test_client()
+    headers = auth_headers(customer_id, role)
+
+    app.config['FAST_JSON'] = True
+    fast = client.get(path, headers=headers)
+    app.config['FAST_JSON'] = False
+    stdlib = client.get(path, headers=headers)
+
+    assert fast.status_code == stdlib.status_code == 200
+    assert fast.mimetype == stdlib.mimetype == 'application/json'
+    assert fast.get_json() == stdlib.get_json()
+    assert fast.get_json()
+
+def test_list_endpoints_keep_their_json_format(app, auth_headers, customer_id):
+    client = app.test_client()
+    headers = auth_headers(customer_id)
+    today = datetime.now().date().isoformat()
+
+    pending, approved = client.get('/api/return-requests', headers=headers).get_json()
+    assert pending['customer_name'] == 'Zoë Brontë'
+    assert pending['request_date'] == today
+    assert pending['approval_date'] is None
+    assert pending['fraud_score'] == 0.0
+    assert pending['order_total'] == 120.5
+    assert approved['approval_date'] == today
+    assert approved['fraud_score'] == 12.5
+
+    refund = client.get('/api/refunds', headers=headers).get_json()[0]
+    assert refund['refund_amount'] == 19.99
+    assert refund['refund_date'] == today
+
+    orders = client.get('/api/orders', headers=headers).get_json()
+    assert [order['total_amount'] for order in orders] == [120.5, 19.99]
+
+    notifications = client.get('/api/notifications', headers=headers).get_json()
+    assert notifications[0]['message'] == 'Refund of €19.99 approved'
+    assert [n['is_read'] for n in notifications] == [False, True]
@@ -0,0 +1,89 @@
+"""
+Static page and asset caching tests.
+Checks that a repeat visit to a page transfers no bytes, that built assets
+are served precompressed with long-lived immutable caching, and that a rebuild
+keeps earlier builds servable until they are pruned.
+"""
+
+import os
+import re
+import gzip
+import time
+
+import pytest
+
+import build_assets
+from app import create_app
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client serving assets built into a temporary dist directory"""
+    dist_dir = str(tmp_path / 'dist')
+    manifest_path = os.path.join(dist_dir, 'manifest.json')
+    monkeypatch.setattr(build_assets, 'DIST_DIR', dist_dir)
+    monkeypatch.setattr(build_assets, 'MANIFEST_PATH', manifest_path)
+    build_assets.build_assets()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True, 'ASSET_DIST_DIR': dist_dir})
+    return app.test_client()
+
+def test_repeat_visit_transfers_no_bytes(client):
+    headers = {'Accept-Encoding': 'gzip'}
+    first = client.get('/customer-dashboard.html', headers=headers)
+    assert first.status_code == 200
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert len(first.data) > 0
+    html = gzip.decompress(first.data).decode('utf-8')
+
+    repeat = client.get('/customer-dashboard.html', headers={**headers, 'If-None-Match': first.headers['ETag']})
+    assert repeat.status_code == 304
+    assert len(repeat.data) == 0
+
+    # Assets are fingerprinted, so a browser reuses them without asking again
+    asset_urls = re.findall(r'(?:href|src)="(/assets/[^"]+)"', html)
+    assert len(asset_urls) == 3
+    for url in asset_urls:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'immutable' in response.headers['Cache-Control']
+        assert len(response.data) > 0
+
+def test_assets_served_uncompressed_without_accept_encoding(client):
+    html = client.get('/login.html').get_data(as_text=True)
+    url = re.search(r'src="(/assets/js/auth\.[0-9a-f]+\.js)"', html).group(1)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert response.mimetype == 'application/javascript'
+
+def test_unknown_asset_is_not_served(client):
+    assert client.get('/assets/js/auth.js').status_code == 404
+
+def test_rebuild_keeps_previous_assets_until_pruned(client, tmp_path, monkeypatch):
+    html = client.get('/login.html').get_data(as_text=True)
+    old_url = re.search(r'src="(/assets/js/auth\.[0-9a-f]+\.js)"', html).group(1)
+
+    source_dir = tmp_path / 'static'
+    for directory in build_assets.ASSET_DIRS:
+        (source_dir / directory).mkdir(parents=True)
+        for filename in os.listdir(os.path.join(build_assets.STATIC_DIR, directory)):
+            with open(os.path.join(build_assets.STATIC_DIR, directory, filename), 'rb') as f:
+                (source_dir / directory / filename).write_bytes(f.read())
+    with open(source_dir / 'js' / 'auth.js', 'a') as f:
+        f.write('\nconsole.log("rebuilt");\n')
+    monkeypatch.setattr(build_assets, 'STATIC_DIR', str(source_dir))
+    build_assets.build_assets()
+
+    # Pages rendered before the rebuild still load the old file
+    assert client.get(old_url).status_code == 200
+    assert build_assets.prune_assets(1) == 0
+
+    old_path = os.path.join(build_assets.DIST_DIR, old_url[len('/assets/'):])
+    long_ago = time.time() - 2 * 24 * 60 * 60
+    for suffix in ('', '.gz', '.br'):
+        if os.path.exists(old_path + suffix):
+            os.utime(old_path + suffix, (long_ago, long_ago))
+    assert build_assets.prune_assets(1) >= 2
+    assert client.get(old_url).status_code == 404
+    assert os.listdir(os.path.join(build_assets.DIST_DIR, 'css'))